@@ -2,23 +2,24 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, Dict
 
+import orjson
 from aidial_sdk import DIALApp, HTTPException
 from aidial_sdk.chat_completion import ChatCompletion, Request, Response
-from fastapi import Request as FastAPIRequest
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response as StarletteResponse, StreamingResponse
+from fastapi import FastAPI, Request as FastAPIRequest
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import asyncio
-from typing import AsyncGenerator
 
-from .template_engine import TemplateEngine, encode_pptx
-from .storage import upload_pptx_file
+from .template_engine import TemplateEngine
+from .storage import close_session, upload_pptx_file
 
 # Configure logging based on environment variable
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -34,6 +35,11 @@ LOGGER = logging.getLogger(__name__)
 
 TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
 ENGINE = TemplateEngine(str(TEMPLATES_DIR))
+# Rendering is synchronous and CPU bound, keep it off the event loop
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "8"))
+_RENDER_POOL = ThreadPoolExecutor(
+    max_workers=RENDER_WORKERS, thread_name_prefix="render"
+)
 DEFAULT_OUTPUT_NAME = "presentation.pptx"
 # Use the PowerPoint MIME type that works best with DIAL and OneDrive
 MIME_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
@@ -42,30 +48,36 @@ MIME_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presen
 DIAL_URL = os.getenv("DIAL_URL")
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log all incoming requests and responses with full details."""
-    
+class LoggingMiddleware:
+    """Pure ASGI middleware to log all incoming requests and responses with full details.
+
+    Unlike ``BaseHTTPMiddleware`` it never drains the request body or buffers
+    the response; messages are observed as they pass through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
     async def _log_response_body(self, response_body: bytes, is_chat_completion: bool):
         """Helper to log response body content."""
         if not is_chat_completion:
             return
-            
+
         body_str = response_body.decode('utf-8', errors='ignore')
-        LOGGER.debug(f"Response body length: {len(body_str)} characters")
-        
+        LOGGER.debug("Response body length: %d characters", len(body_str))
+
         if len(body_str) < 2000:  # Log smaller responses in full
-            LOGGER.debug(f"Full response body: {body_str}")
+            LOGGER.debug("Full response body: %s", body_str)
         else:
             # For larger responses, log the beginning and end
-            LOGGER.debug(f"Response body (first 1000 chars): {body_str[:1000]}")
-            LOGGER.debug(f"Response body (last 500 chars): {body_str[-500:]}")
-            
+            LOGGER.debug("Response body (first 1000 chars): %s", body_str[:1000])
+            LOGGER.debug("Response body (last 500 chars): %s", body_str[-500:])
+
         # Try to parse as JSON and log structure
         try:
             if body_str.strip():
-                import json
-                parsed = json.loads(body_str)
-                LOGGER.debug(f"Response JSON structure: {self._get_json_structure(parsed)}")
+                parsed = orjson.loads(body_str)
+                LOGGER.debug("Response JSON structure: %s", self._get_json_structure(parsed))
         except:
             LOGGER.debug("Response body is not valid JSON")
     
@@ -85,74 +97,96 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             return f"string(len={len(obj)})"
         else:
             return type(obj).__name__
-    
-    async def dispatch(self, request: FastAPIRequest, call_next):
-        # Log incoming request details
-        LOGGER.info(f"=== INCOMING REQUEST ===")
-        LOGGER.info(f"Method: {request.method}")
-        LOGGER.info(f"URL: {request.url}")
-        LOGGER.info(f"Path: {request.url.path}")
-        LOGGER.info(f"Query params: {dict(request.query_params)}")
-        LOGGER.info(f"Headers: {dict(request.headers)}")
-        LOGGER.info(f"Client: {request.client}")
-        
-        # Try to log body for POST/PUT requests
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                LOGGER.info(f"Body length: {len(body)} bytes")
-                if len(body) < 1000:  # Only log small bodies in full
-                    LOGGER.info(f"Body content: {body.decode('utf-8', errors='ignore')}")
-                else:
-                    LOGGER.info(f"Body content (first 500 chars): {body[:500].decode('utf-8', errors='ignore')}...")
-            except Exception as e:
-                LOGGER.error(f"Failed to read request body: {e}")
-        
-        # Process the request
-        response = None
+
+    def _log_request_body(self, message: Message) -> None:
+        """Helper to log the first ``http.request`` body chunk."""
         try:
-            response = await call_next(request)
-            
-            # Log response details
-            LOGGER.info(f"=== OUTGOING RESPONSE ===")
-            LOGGER.info(f"Response status: {response.status_code}")
-            LOGGER.info(f"Response headers: {dict(response.headers)}")
-            
-            # Enhanced response logging for chat completions
-            is_chat_completion = request.url.path.endswith('/chat/completions')
-            if is_chat_completion:
-                try:
-                    LOGGER.info("Chat completion response generated")
-                    LOGGER.debug(f"Response media type: {response.media_type}")
-                    LOGGER.debug(f"Response charset: {getattr(response, 'charset', 'N/A')}")
-                    
+            body = message.get("body", b"")
+            suffix = " (first chunk)" if message.get("more_body", False) else ""
+            LOGGER.debug("Body length: %d bytes%s", len(body), suffix)
+            if len(body) < 1000:  # Only log small bodies in full
+                LOGGER.debug("Body content: %s", body.decode('utf-8', errors='ignore'))
+            else:
+                LOGGER.debug("Body content (first 500 chars): %s...", body[:500].decode('utf-8', errors='ignore'))
+        except Exception as e:
+            LOGGER.error("Failed to read request body: %s", e)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Everything below logs at DEBUG, so skip the wrapping entirely otherwise
+        if scope["type"] != "http" or not LOGGER.isEnabledFor(logging.DEBUG):
+            await self.app(scope, receive, send)
+            return
+
+        # Built from the scope only, so the body stays untouched for the app
+        request = FastAPIRequest(scope)
+
+        # Log incoming request details
+        LOGGER.debug("=== INCOMING REQUEST ===")
+        LOGGER.debug("Method: %s", request.method)
+        LOGGER.debug("URL: %s", request.url)
+        LOGGER.debug("Path: %s", request.url.path)
+        LOGGER.debug("Query params: %s", dict(request.query_params))
+        LOGGER.debug("Headers: %s", dict(request.headers))
+        LOGGER.debug("Client: %s", request.client)
+
+        log_request_body = request.method in ["POST", "PUT", "PATCH"]
+        is_chat_completion = request.url.path.endswith('/chat/completions')
+        response_body_seen = False
+
+        async def logging_receive() -> Message:
+            # Tee the first body chunk into the log and pass it through as is
+            nonlocal log_request_body
+            message = await receive()
+            if log_request_body and message["type"] == "http.request":
+                log_request_body = False
+                self._log_request_body(message)
+            return message
+
+        async def logging_send(message: Message) -> None:
+            nonlocal response_body_seen
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+
+                # Log response details
+                LOGGER.debug("=== OUTGOING RESPONSE ===")
+                LOGGER.debug("Response status: %s", message['status'])
+                LOGGER.debug("Response headers: %s", dict(headers))
+
+                if is_chat_completion:
+                    LOGGER.debug("Chat completion response generated")
+                    LOGGER.debug("Response media type: %s", headers.get('content-type'))
+
                     # Log response size if available
-                    content_length = response.headers.get('content-length')
+                    content_length = headers.get('content-length')
                     if content_length:
-                        LOGGER.info(f"Response content length: {content_length} bytes")
-                    
-                    # For StreamingResponse, we need special handling
-                    if isinstance(response, StreamingResponse):
-                        LOGGER.debug("Response is a StreamingResponse - cannot easily log body")
-                    elif hasattr(response, 'body') and response.body:
-                        # Try to read and log the response body
-                        try:
-                            await self._log_response_body(response.body, True)
-                        except Exception as e:
-                            LOGGER.debug(f"Could not log response body: {e}")
-                    else:
-                        LOGGER.debug("Response has no accessible body attribute")
-                        
-                except Exception as e:
-                    LOGGER.debug(f"Could not log detailed response info: {e}")
-                    
-            LOGGER.info(f"=== RESPONSE SENT ===")
-            return response
+                        LOGGER.debug("Response content length: %s bytes", content_length)
+
+            elif (
+                message["type"] == "http.response.body"
+                and is_chat_completion
+                and not response_body_seen
+            ):
+                response_body_seen = True
+                # Streamed responses arrive in many chunks, only log complete bodies
+                if message.get("more_body", False):
+                    LOGGER.debug("Response is streamed - cannot easily log body")
+                else:
+                    try:
+                        await self._log_response_body(message.get("body", b""), True)
+                    except Exception as e:
+                        LOGGER.debug("Could not log response body: %s", e)
+
+            await send(message)
+
+        try:
+            await self.app(scope, logging_receive, logging_send)
         except Exception as e:
-            LOGGER.error(f"Request failed with exception: {e}")
-            LOGGER.info(f"=== REQUEST FAILED ===")
+            LOGGER.error("Request failed with exception: %s", e)
+            LOGGER.debug("=== REQUEST FAILED ===")
             raise
 
+        LOGGER.debug("=== RESPONSE SENT ===")
+
 
 class PresentationApplication(ChatCompletion):
     """Render a PowerPoint file from a JSON description."""
@@ -164,64 +198,60 @@ class PresentationApplication(ChatCompletion):
         self.file_storage = None
 
     async def chat_completion(self, request: Request, response: Response) -> None:
-        LOGGER.info("=== CHAT COMPLETION REQUEST ===")
-        LOGGER.info(f"Request messages count: {len(request.messages) if request.messages else 0}")
-        LOGGER.debug(f"Full request object: {request}")
-        
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            LOGGER.debug("=== CHAT COMPLETION REQUEST ===")
+            LOGGER.debug("Request messages count: %d", len(request.messages) if request.messages else 0)
+            LOGGER.debug("Full request object: %s", request)
+
         if not request.messages:
             LOGGER.error("Request is empty - no messages provided")
             raise HTTPException(status_code=422, message="The request is empty")
 
         message = request.messages[-1]
         content = message.text()
-        LOGGER.info(f"Processing message content length: {len(content)} characters")
-        LOGGER.debug(f"Message content: {content}")
+        if debug:
+            LOGGER.debug("Processing message content length: %d characters", len(content))
+            LOGGER.debug("Message content: %s", content)
 
         try:
-            payload = json.loads(content)
+            # The SDK exposes no raw-bytes accessor for message content, so
+            # the decoded str goes straight to orjson
+            payload = orjson.loads(content)
             if not isinstance(payload, dict):
                 raise ValueError("Payload must be a JSON object")
-            LOGGER.info(f"Successfully parsed JSON payload with keys: {list(payload.keys())}")
-            LOGGER.debug(f"Full payload: {payload}")
-        except (json.JSONDecodeError, ValueError) as exc:
+            if debug:
+                LOGGER.debug("Parsed JSON payload with keys: %s", list(payload.keys()))
+                LOGGER.debug("Full payload: %s", payload)
+        except (orjson.JSONDecodeError, ValueError) as exc:
             LOGGER.exception("Failed to parse request payload")
             raise HTTPException(
                 status_code=422, message=f"Invalid JSON payload: {exc}"
             ) from exc
 
         output_name = _resolve_output_name(payload)
-        LOGGER.info(f"Output filename: {output_name}")
+        LOGGER.debug("Output filename: %s", output_name)
 
         try:
-            LOGGER.info("Starting presentation rendering...")
-            pptx_bytes = ENGINE.render(payload)
-            LOGGER.info(f"Successfully rendered presentation, size: {len(pptx_bytes)} bytes")
+            pptx_bytes = await asyncio.get_running_loop().run_in_executor(
+                _RENDER_POOL, ENGINE.render, payload
+            )
+            LOGGER.debug("Rendered presentation, size: %d bytes", len(pptx_bytes))
         except Exception as exc:  # pragma: no cover - converted to HTTP error
             LOGGER.exception("Failed to render presentation")
             raise HTTPException(status_code=500, message=str(exc)) from exc
-        
-        LOGGER.info("Creating response with attachment...")
-        
+
         # Create response following DIAL SDK pattern for Option B (upload to storage)
         with response.create_single_choice() as choice:
-            LOGGER.debug("Response choice created successfully")
-            
             choice.append_content(
                 f"Generated presentation '{output_name}' using template instructions."
             )
-            LOGGER.debug("Content appended to choice")
-            
-            LOGGER.info("Adding PowerPoint attachment...")
-            
+
             # Option B: Upload to DIAL storage and attach by URL (makes it clickable/downloadable)
             try:
                 filename = output_name
 
-                # 1) Convert PPTX to base64 (per example)
-                pptx_base64 = encode_pptx(pptx_bytes)
-                LOGGER.info(f"PPTX converted to base64, size: {len(pptx_base64)} chars")
-
-                # 2) Upload to DIAL storage (per example)
+                # 1) Upload the raw PPTX bytes to DIAL storage (per example)
                 # Follow the SDK example: require DIAL_URL and upload via REST
                 if DIAL_URL is None:
                     raise ValueError("DIAL_URL environment variable is unset")
@@ -230,29 +260,26 @@ class PresentationApplication(ChatCompletion):
                 file_url = await upload_pptx_file(
                     DIAL_URL,
                     filepath,
-                    pptx_base64,
+                    pptx_bytes,
                     content_type=MIME_TYPE,
                 )
-                LOGGER.info(f"Uploaded to DIAL storage. URL: {file_url}")
+                LOGGER.debug("Uploaded to DIAL storage. URL: %s", file_url)
 
-                # 3) Present to the user as an attachment with URL (per example)
+                # 2) Present to the user as an attachment with URL (per example)
                 choice.add_attachment(
                     type=MIME_TYPE,
                     title=output_name,
                     url=file_url
                 )
-                LOGGER.info("PowerPoint attachment added with URL")
 
             except Exception as e:
-                LOGGER.error(f"Failed to upload/create attachment: {e}")
+                LOGGER.error("Failed to upload/create attachment: %s", e)
                 raise HTTPException(
                     status_code=500, 
                     message=f"Failed to create presentation attachment: {e}"
                 )
-            
-        LOGGER.info("=== CHAT COMPLETION SUCCESSFUL ===")
-        LOGGER.info("Response created successfully with presentation attachment")
-        LOGGER.debug("Response object fully constructed and ready to send")
+
+        LOGGER.debug("Response created with presentation attachment")
 
 
 def _resolve_output_name(payload: Dict[str, Any]) -> str:
@@ -272,23 +299,35 @@ LOGGER.info("=== APPLICATION STARTUP ===")
 LOGGER.info(f"Log level set to: {LOG_LEVEL}")
 LOGGER.info(f"DIAL_URL configured: {'Yes' if DIAL_URL else 'No'}")
 LOGGER.info(f"Templates directory: {TEMPLATES_DIR}")
+LOGGER.info(f"Render workers: {RENDER_WORKERS}")
 
 # DIAL SDK will handle file storage automatically when configured
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release the storage client session shared across uploads
+    await close_session()
+    _RENDER_POOL.shutdown(wait=False)
+
+
 # Create DIAL app with optional DIAL Core integration
 app = DIALApp(
     dial_url=DIAL_URL,
     propagate_auth_headers=bool(DIAL_URL),  # Only enable if DIAL_URL is set
-    add_healthcheck=True
+    add_healthcheck=True,
+    lifespan=lifespan,
 )
 
-# Add logging middleware to capture all HTTP requests
-app.add_middleware(LoggingMiddleware)
+# Add logging middleware to capture all HTTP requests; it only logs at DEBUG,
+# so keep it out of the request path at any other level
+if LOG_LEVEL == "DEBUG":
+    app.add_middleware(LoggingMiddleware)
 
 # Add health check logging
 @app.get("/health")
 async def health_check():
-    LOGGER.info("Health check endpoint accessed")
+    LOGGER.debug("Health check endpoint accessed")
     return {"status": "healthy", "service": "json-to-pptx"}
 
 app.add_chat_completion("json-to-pptx", PresentationApplication())
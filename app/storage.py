@@ -1,35 +1,59 @@
-import base64
 import os
-from io import BytesIO
+from typing import Optional
 
 import aiohttp
 
+_SESSION: Optional[aiohttp.ClientSession] = None
 
-async def upload_pptx_file(dial_url: str, filepath: str, pptx_base64: str, content_type: str = "application/vnd.openxmlformats-officedocument.presentationml.presentation") -> str:
-    """Upload a PPTX file (base64) to DIAL storage and return a URL.
 
-    Mirrors the pattern from ai-dial-sdk examples/render_text/app/image.py
-    but adapted for PPTX content type and path.
+def _get_session() -> aiohttp.ClientSession:
+    """Return the shared client session, creating it on first use.
+
+    Reusing one session keeps connections (and TLS sessions) to DIAL alive
+    across uploads instead of handshaking on every request.  Cookies are
+    never stored, so nothing set for one user's request leaks into another's.
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{dial_url}/v1/bucket") as response:
-            response.raise_for_status()
-            appdata = (await response.json())["appdata"]
-
-        pptx_bytes = base64.b64decode(pptx_base64)
-
-        data = aiohttp.FormData()
-        data.add_field(
-            name="file",
-            content_type=content_type,
-            value=BytesIO(pptx_bytes),
-            filename=os.path.basename(filepath),
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            cookie_jar=aiohttp.DummyCookieJar(),
         )
+    return _SESSION
+
+
+async def close_session() -> None:
+    """Close the shared client session, if one was opened."""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
 
-        async with session.put(
-            f"{dial_url}/v1/files/{appdata}/{filepath}", data=data
-        ) as response:
-            response.raise_for_status()
-            metadata = await response.json()
+
+async def upload_pptx_file(dial_url: str, filepath: str, pptx_bytes: bytes, content_type: str = "application/vnd.openxmlformats-officedocument.presentationml.presentation") -> str:
+    """Upload raw PPTX bytes to DIAL storage and return a URL.
+
+    Mirrors the pattern from ai-dial-sdk examples/render_text/app/image.py
+    but adapted for PPTX content type and path.
+    """
+    session = _get_session()
+
+    async with session.get(f"{dial_url}/v1/bucket") as response:
+        response.raise_for_status()
+        appdata = (await response.json())["appdata"]
+
+    data = aiohttp.FormData()
+    data.add_field(
+        name="file",
+        content_type=content_type,
+        value=pptx_bytes,
+        filename=os.path.basename(filepath),
+    )
+
+    async with session.put(
+        f"{dial_url}/v1/files/{appdata}/{filepath}", data=data
+    ) as response:
+        response.raise_for_status()
+        metadata = await response.json()
 
     return metadata["url"]
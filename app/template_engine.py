@@ -14,25 +14,39 @@ import base64
 import copy
 import io
 import re
+from collections import ChainMap
+from functools import lru_cache
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Mapping, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
+from lxml import etree
 from pptx import Presentation
+from pptx.oxml.ns import qn
 from pptx.shapes.graphfrm import GraphicFrame
-from pptx.table import Table
 
 PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z0-9._\-]+)\}")
 SLIDE_ID_PATTERN = re.compile(r"\{id:([A-Za-z0-9._\-]+)\}")
 
+_A_P = qn('a:p')
+_A_R = qn('a:r')
+_A_T = qn('a:t')
+_FIRST_RPR_PATH = f"./{_A_P}/{_A_R}/{qn('a:rPr')}"
+
+
+@lru_cache(maxsize=1024)
+def _split_path(path: str) -> Tuple[str, ...]:
+    """Split a dotted path into its non-empty parts."""
+
+    return tuple(part for part in path.split('.') if part)
+
 
 def _resolve_path(data: Any, path: str) -> Optional[Any]:
     """Resolve a dotted path inside ``data``."""
 
-    parts = [part for part in path.split('.') if part]
     value: Any = data
 
-    for part in parts:
+    for part in _split_path(path):
         if isinstance(value, Mapping):
             value = value.get(part)
         elif isinstance(value, list) and part.isdigit():
@@ -58,36 +72,97 @@ def _iter_text_shapes(slide) -> Iterable[Any]:
             yield shape
 
 
-def _iter_tables(slide) -> Iterable[Table]:
-    for shape in slide.shapes:
-        if isinstance(shape, GraphicFrame) and shape.has_table:
-            yield shape.table
+@lru_cache(maxsize=16)
+def _load_template(path: str) -> Tuple[bytes, Dict[str, int]]:
+    """Read a template once and index its ``{id:...}`` markers.
 
+    Returns the raw file bytes together with a mapping of slide ids to slide
+    indices.  Every render builds its own ``Presentation`` from the bytes, so
+    the cached entry is never mutated.  Call ``_load_template.cache_clear()``
+    after replacing a template on disk.
+    """
 
-def _replace_placeholders_in_text_frame(text_frame, model: Mapping[str, Any]):
-    """Replace all ``{placeholder}`` entries with values from ``model``."""
+    data = Path(path).read_bytes()
+    slide_ids: Dict[str, int] = {}
 
-    if not text_frame.text:
-        return
+    for slide_index, slide in enumerate(Presentation(io.BytesIO(data)).slides):
+        for shape in _iter_text_shapes(slide):
+            text = shape.text
+            # Most shapes carry no marker, skip them before starting the regex
+            if not text or '{id:' not in text:
+                continue
+            match = SLIDE_ID_PATTERN.search(text)
+            if match:
+                slide_ids.setdefault(match.group(1), slide_index)
 
-    matches = list(PLACEHOLDER_PATTERN.finditer(text_frame.text))
-    if not matches:
-        return
+    return data, slide_ids
+
+
+def _table_shapes(slide) -> List[GraphicFrame]:
+    return [
+        shape
+        for shape in slide.shapes
+        if isinstance(shape, GraphicFrame) and shape.has_table
+    ]
+
+
+def _replace_placeholders_in_text_frame(
+    text_frame, model: Mapping[str, Any], cache: Dict[str, str]
+):
+    """Replace all ``{placeholder}`` entries with values from ``model``.
+
+    ``cache`` maps placeholder paths to their rendered replacement and is
+    shared by every text frame resolved against the same ``model``.
+    """
 
     original_text = text_frame.text
-    replaced_text = original_text
+    if not original_text:
+        return
 
-    for match in matches:
+    def replace(match) -> str:
         path = match.group(1)
+        if path in cache:
+            return cache[path]
         value = _resolve_path(model, path)
-        replacement = '' if value is None else str(value)
-        replaced_text = replaced_text.replace(match.group(0), replacement)
+        replacement = cache[path] = '' if value is None else str(value)
+        return replacement
+
+    replaced_text = PLACEHOLDER_PATTERN.sub(replace, original_text)
 
     if replaced_text != original_text:
         text_frame.clear()
         text_frame.text = replaced_text
 
 
+def _set_cell_text_fast(cell, text: str) -> None:
+    """Write ``text`` into a table cell by editing its ``<a:txBody>`` directly.
+
+    Behaves like ``cell.text = text`` (one paragraph per line) without going
+    through python-pptx's per-element helpers, and keeps the formatting of
+    the cell's first run.  Text lxml refuses, such as the vertical tab
+    python-pptx maps to a line break, falls back to ``cell.text``.
+    """
+
+    txBody = cell._tc.get_or_add_txBody()
+    first_rPr = txBody.find(_FIRST_RPR_PATH)
+    paragraphs = txBody.findall(_A_P)
+
+    try:
+        for line in text.split('\n'):
+            p = etree.SubElement(txBody, _A_P)
+            if line:
+                r = etree.SubElement(p, _A_R)
+                if first_rPr is not None:
+                    r.append(copy.deepcopy(first_rPr))
+                etree.SubElement(r, _A_T).text = line
+    except ValueError:
+        cell.text = text
+        return
+
+    for p in paragraphs:
+        txBody.remove(p)
+
+
 @dataclass
 class TableInstruction:
     """Configuration for populating a table."""
@@ -107,10 +182,9 @@ class SlideInstruction:
     replacements: Mapping[str, Any] = field(default_factory=dict)
     tables: List[TableInstruction] = field(default_factory=list)
 
-    def context(self, global_context: Mapping[str, Any]) -> Dict[str, Any]:
-        merged = copy.deepcopy(global_context)
-        merged.update(self.replacements)
-        return merged
+    def context(self, global_context: Mapping[str, Any]) -> ChainMap:
+        # Placeholder resolution only reads, so layer instead of copying
+        return ChainMap(dict(self.replacements), global_context)
 
 
 class TemplateEngine:
@@ -129,24 +203,46 @@ class TemplateEngine:
                 )
             )
 
-        presentation = Presentation(str(template_path))
+        template_bytes, slide_ids = _load_template(str(template_path))
+        presentation = Presentation(io.BytesIO(template_bytes))
         context = payload.get('context', {})
 
         for slide_payload in payload.get('slides', []):
             instruction = self._parse_slide_instruction(slide_payload)
-            slide = self._resolve_slide(presentation, instruction)
+            slide = self._resolve_slide(presentation, instruction, slide_ids)
             model = instruction.context(context)
+            resolved: Dict[str, str] = {}
 
             for shape in _iter_text_shapes(slide):
-                _replace_placeholders_in_text_frame(shape.text_frame, model)
-
-            for table in _iter_tables(slide):
-                for row in table.rows:
+                _replace_placeholders_in_text_frame(shape.text_frame, model, resolved)
+
+            table_shapes = _table_shapes(slide)
+            tables_by_name: Dict[str, GraphicFrame] = {}
+            for shape in table_shapes:
+                tables_by_name.setdefault(shape.name, shape)
+
+            # Tables that get fully rewritten below don't need substituting
+            populated = {
+                id(tables_by_name[table_instruction.shape])
+                for table_instruction in instruction.tables
+                if table_instruction.clear_extra_rows
+                and table_instruction.shape in tables_by_name
+            }
+            for shape in table_shapes:
+                if id(shape) in populated:
+                    continue
+                for row in shape.table.rows:
                     for cell in row.cells:
-                        _replace_placeholders_in_text_frame(cell.text_frame, model)
+                        _replace_placeholders_in_text_frame(
+                            cell.text_frame, model, resolved
+                        )
 
             for table_instruction in instruction.tables:
-                self._populate_table(slide, table_instruction, model)
+                self._populate_table(
+                    tables_by_name.get(table_instruction.shape),
+                    table_instruction,
+                    model,
+                )
 
         output = io.BytesIO()
         presentation.save(output)
@@ -171,17 +267,19 @@ class TemplateEngine:
             tables=tables,
         )
 
-    def _resolve_slide(self, presentation: Presentation, instruction: SlideInstruction):
+    def _resolve_slide(
+        self,
+        presentation: Presentation,
+        instruction: SlideInstruction,
+        slide_ids: Mapping[str, int],
+    ):
         if instruction.id:
-            for slide in presentation.slides:
-                for shape in _iter_text_shapes(slide):
-                    text = shape.text
-                    if not text:
-                        continue
-                    match = SLIDE_ID_PATTERN.search(text)
-                    if match and match.group(1) == instruction.id:
-                        return slide
-            raise ValueError(f"Slide with id '{instruction.id}' was not found")
+            try:
+                return presentation.slides[slide_ids[instruction.id]]
+            except KeyError as exc:
+                raise ValueError(
+                    f"Slide with id '{instruction.id}' was not found"
+                ) from exc
 
         if instruction.index is None:
             raise ValueError("Either 'id' or 'index' must be provided for a slide")
@@ -195,28 +293,22 @@ class TemplateEngine:
 
     def _populate_table(
         self,
-        slide,
+        target_shape: Optional[GraphicFrame],
         instruction: TableInstruction,
         model: Mapping[str, Any],
     ) -> None:
-        target_shape = None
-        for shape in slide.shapes:
-            if getattr(shape, 'name', None) == instruction.shape and isinstance(
-                shape, GraphicFrame
-            ) and shape.has_table:
-                target_shape = shape
-                break
-
         if target_shape is None:
             raise ValueError(f"Table '{instruction.shape}' was not found on the slide")
 
         table = target_shape.table
-        data_rows = copy.deepcopy(instruction.data)
-        if instruction.header:
-            data_rows.insert(0, instruction.header)
+        # Rows are only read, so share them with the instruction instead of copying
+        data_rows = ([instruction.header] if instruction.header else []) + list(
+            instruction.data
+        )
 
         required_rows = len(data_rows)
         current_rows = len(table.rows)
+        current_cols = len(table.columns)
 
         if required_rows > current_rows:
             raise ValueError(
@@ -226,24 +318,25 @@ class TemplateEngine:
         if data_rows:
             required_cols = max(len(row) for row in data_rows)
         else:
-            required_cols = len(table.columns)
+            required_cols = current_cols
 
-        if required_cols > len(table.columns):
+        if required_cols > current_cols:
             raise ValueError(
-                f"Table '{instruction.shape}' expects {len(table.columns)} columns"
+                f"Table '{instruction.shape}' expects {current_cols} columns"
             )
 
-        for row_index, row_values in enumerate(data_rows):
-            for col_index in range(len(table.columns)):
-                cell = table.cell(row_index, col_index)
-                value = row_values[col_index] if col_index < len(row_values) else ''
-                cell.text = '' if value is None else str(value)
-
-        if instruction.clear_extra_rows and required_rows < len(table.rows):
-            for row_index in range(required_rows, len(table.rows)):
-                for col_index in range(len(table.columns)):
-                    cell = table.cell(row_index, col_index)
-                    cell.text = ''
+        for row_index, row in enumerate(table.rows):
+            if row_index < required_rows:
+                row_values = data_rows[row_index]
+                value_count = len(row_values)
+                for col_index, cell in enumerate(row.cells):
+                    value = row_values[col_index] if col_index < value_count else ''
+                    _set_cell_text_fast(cell, '' if value is None else str(value))
+            elif instruction.clear_extra_rows:
+                for cell in row.cells:
+                    _set_cell_text_fast(cell, '')
+            else:
+                break
 
 
 def encode_pptx(data: bytes) -> str: